@@ -2,7 +2,9 @@
 
 from __future__ import annotations
 
+import csv
 import re
+import sqlite3
 
 import click
 from rich.console import Console
@@ -16,16 +18,48 @@ from .sync import sync_all
 
 console = Console()
 
+_DATA_PUB_RE = re.compile(r"^(\S+)\s+DATA:\s*(\d{2})/(\d{2})/(\d{4})")
+
 
 @click.group()
-def cli() -> None:
+@click.pass_context
+def cli(ctx: click.Context) -> None:
     """STJ Jurisprudence Search Tool."""
+    ctx.ensure_object(dict)
+
+
+def _open_readonly() -> sqlite3.Connection:
+    """Open the database read-only, creating or migrating it first only if needed."""
+    if DB_PATH.exists():
+        conn = db.get_connection(readonly=True)
+        if not db.needs_init(conn):
+            return conn
+        conn.close()
+    conn = db.get_connection()
+    db.init_db(conn)
+    conn.close()
+    return db.get_connection(readonly=True)
+
+
+def _get_conn(ctx: click.Context, *, readonly: bool = False) -> sqlite3.Connection:
+    """Open the database on first use and reuse it for the rest of the invocation."""
+    obj = ctx.ensure_object(dict)
+    if "conn" not in obj:
+        if readonly:
+            conn = _open_readonly()
+        else:
+            conn = db.get_connection()
+            db.init_db(conn)
+        ctx.find_root().call_on_close(conn.close)
+        obj["conn"] = conn
+    return obj["conn"]
 
 
 @cli.command()
 @click.option("-d", "--dataset", default=None, help="Sync a specific dataset only.")
 @click.option("--force", is_flag=True, help="Re-download everything.")
-def sync(dataset: str | None, force: bool) -> None:
+@click.pass_context
+def sync(ctx: click.Context, dataset: str | None, force: bool) -> None:
     """Download and index STJ datasets."""
     if dataset and dataset not in DATASETS:
         console.print(f"[red]Unknown dataset: {dataset}[/]")
@@ -34,32 +68,29 @@ def sync(dataset: str | None, force: bool) -> None:
             console.print(f"  {ds}")
         raise SystemExit(1)
 
-    conn = db.get_connection()
-    try:
-        if force:
-            db.clear_sync_state(conn, dataset)
-        sync_all(conn, dataset_filter=dataset, force=force)
-    finally:
-        conn.close()
+    conn = _get_conn(ctx)
+    if force:
+        db.clear_sync_state(conn, dataset)
+    sync_all(conn, dataset_filter=dataset, force=force)
 
 
 @cli.command()
 @click.argument("query")
-@click.option("-m", "--ministro", default=None, help="Filter by ministro relator.")
-@click.option("-c", "--classe", default=None, help="Filter by sigla classe (e.g. REsp).")
+@click.option("-m", "--ministro", default=None, help="Filter by ministro relator prefix (% matches anything).")
+@click.option("-c", "--classe", default=None, help="Filter by sigla classe prefix (e.g. REsp, %REsp).")
 @click.option("--desde", default=None, help="Filter decisions from date (YYYYMMDD).")
 @click.option("-n", "--limit", default=20, help="Max results (default: 20).")
 @click.option("--data", "order", flag_value="data", default=True, help="Sort by date, newest first (default).")
 @click.option("--palavra", "order", flag_value="palavra", help="Sort by relevance (BM25).")
 @click.option("--stats", is_flag=True, help="Show statistics instead of individual results.")
-def busca(query: str, ministro: str | None, classe: str | None, desde: str | None, limit: int, order: str, stats: bool) -> None:
+@click.pass_context
+def busca(ctx: click.Context, query: str, ministro: str | None, classe: str | None, desde: str | None, limit: int, order: str, stats: bool) -> None:
     """Full-text search on STJ acordaos.
 
     Supports FTS5 syntax: AND, OR, "exact phrases", prefix*.
     """
-    conn = db.get_connection()
     try:
-        db.init_db(conn)
+        conn = _get_conn(ctx, readonly=True)
         if stats:
             _busca_stats(conn, query, ministro=ministro, classe=classe, desde=desde)
         else:
@@ -67,8 +98,6 @@ def busca(query: str, ministro: str | None, classe: str | None, desde: str | Non
     except Exception as e:
         console.print(f"[red]Search error: {e}[/]")
         raise SystemExit(1)
-    finally:
-        conn.close()
 
 
 def _busca_results(
@@ -87,16 +116,8 @@ def _busca_results(
     table.add_column("Data", width=10)
     table.add_column("Ementa")
 
-    for i, row in enumerate(results, 1):
-        ementa = row["ementa"] or ""
-        table.add_row(
-            str(i),
-            row["id"],
-            row["sigla_classe"],
-            row["ministro_relator"],
-            row["data_decisao"],
-            ementa,
-        )
+    for i, (record_id, sigla, relator, data_decisao, ementa) in enumerate(results, 1):
+        table.add_row(str(i), record_id, sigla, relator, data_decisao, ementa or "")
 
     console.print(table)
     console.print(f"\n[dim]{len(results)} results shown.[/]")
@@ -118,52 +139,54 @@ def _busca_stats(
     if desde:
         filters.append(f"desde={desde}")
     subtitle = f"  filters: {', '.join(filters)}" if filters else ""
-    console.print(Panel(
-        f"[bold]{s['total']:,}[/] matching records",
-        title=f"Stats: {query}",
-        subtitle=subtitle,
-        border_style="blue",
-    ))
-
-    if s["by_orgao"]:
-        table = Table(title="By Orgao Julgador")
-        table.add_column("Orgao Julgador", style="cyan")
-        table.add_column("Count", justify="right")
-        table.add_column("%", justify="right", style="dim")
-        for row in s["by_orgao"]:
-            pct = row["cnt"] / s["total"] * 100
-            table.add_row(row["orgao_julgador"], f"{row['cnt']:,}", f"{pct:.1f}")
-        console.print(table)
+    total = s["total"]
+    # Piped output skips Rich layout entirely and comes out as TSV.
+    tsv = None if console.is_terminal else csv.writer(console.file, delimiter="\t", lineterminator="\n")
+    if tsv:
+        tsv.writerow(["Total", total])
+    else:
+        console.print(Panel(
+            f"[bold]{total:,}[/] matching records",
+            title=f"Stats: {query}",
+            subtitle=subtitle,
+            border_style="blue",
+        ))
+
+    breakdowns = [
+        ("By Orgao Julgador", "Orgao Julgador", s["by_orgao"]),
+        ("Top 10 Classes", "Classe", s["by_classe"]),
+        ("Top 10 Relatores", "Ministro Relator", s["by_relator"]),
+        ("By Year (last 15)", "Year", s["by_year"]),
+    ]
+    for title, label, rows in breakdowns:
+        if rows:
+            _print_breakdown(title, label, rows, total, tsv)
 
-    if s["by_classe"]:
-        table = Table(title="Top 10 Classes")
-        table.add_column("Classe", style="cyan")
-        table.add_column("Count", justify="right")
-        table.add_column("%", justify="right", style="dim")
-        for row in s["by_classe"]:
-            pct = row["cnt"] / s["total"] * 100
-            table.add_row(row["sigla_classe"], f"{row['cnt']:,}", f"{pct:.1f}")
-        console.print(table)
 
-    if s["by_relator"]:
-        table = Table(title="Top 10 Relatores")
-        table.add_column("Ministro Relator", style="cyan")
-        table.add_column("Count", justify="right")
-        table.add_column("%", justify="right", style="dim")
-        for row in s["by_relator"]:
-            pct = row["cnt"] / s["total"] * 100
-            table.add_row(row["ministro_relator"], f"{row['cnt']:,}", f"{pct:.1f}")
-        console.print(table)
+def _print_breakdown(title: str, label: str, rows: list, total: int, tsv) -> None:
+    """Print (key, count) rows with their share of total, as a table or TSV."""
+    if tsv:
+        tsv.writerow([label, "Count", "%"])
+        tsv.writerows((key, cnt, f"{cnt / total * 100:.1f}") for key, cnt in rows)
+        tsv.writerow([])
+        return
 
-    if s["by_year"]:
-        table = Table(title="By Year (last 15)")
-        table.add_column("Year", style="cyan")
-        table.add_column("Count", justify="right")
-        table.add_column("%", justify="right", style="dim")
-        for row in s["by_year"]:
-            pct = row["cnt"] / s["total"] * 100
-            table.add_row(row["ano"], f"{row['cnt']:,}", f"{pct:.1f}")
-        console.print(table)
+    table = Table(title=title, show_edge=False, padding=(0, 1))
+    table.add_column(label, style="cyan")
+    table.add_column("Count", justify="right")
+    table.add_column("%", justify="right", style="dim")
+    for key, cnt in rows:
+        table.add_row(key, f"{cnt:,}", f"{cnt / total * 100:.1f}")
+    console.print(table)
+
+
+def _fmt_thousands(digits: str) -> str:
+    """Group a digit string with '.' every three places, e.g. 1234567 -> 1.234.567."""
+    digits = digits.lstrip("0") or "0"
+    head = len(digits) % 3 or 3
+    groups = [digits[:head]]
+    groups.extend(digits[i:i + 3] for i in range(head, len(digits), 3))
+    return ".".join(groups)
 
 
 def _format_citation(row) -> str:
@@ -173,10 +196,7 @@ def _format_citation(row) -> str:
     sigla = row["sigla_classe"] or ""
     num_raw = row["numero_processo"] or ""
     if sigla and num_raw:
-        try:
-            num_fmt = f"{int(num_raw):,}".replace(",", ".")
-        except ValueError:
-            num_fmt = num_raw
+        num_fmt = _fmt_thousands(num_raw) if num_raw.isascii() and num_raw.isdigit() else num_raw
         parts.append(f"{sigla} n. {num_fmt}")
 
     relator = row["ministro_relator"] or ""
@@ -193,10 +213,9 @@ def _format_citation(row) -> str:
 
     data_pub = row["data_publicacao"] or ""
     if data_pub:
-        m = re.match(r"^(\S+)\s+DATA:\s*(\d{2}/\d{2}/\d{4})", data_pub)
+        m = _DATA_PUB_RE.match(data_pub)
         if m:
-            source = m.group(1)
-            d, mo, y = m.group(2).split("/")
+            source, d, mo, y = m.groups()
             parts.append(f"{source} de {int(d)}/{int(mo)}/{y}")
 
     return "(" + ", ".join(parts) + ")."
@@ -204,14 +223,10 @@ def _format_citation(row) -> str:
 
 @cli.command()
 @click.argument("record_id")
-def ver(record_id: str) -> None:
+@click.pass_context
+def ver(ctx: click.Context, record_id: str) -> None:
     """View full details of an acordao by ID."""
-    conn = db.get_connection()
-    try:
-        db.init_db(conn)
-        row = db.get_by_id(conn, record_id)
-    finally:
-        conn.close()
+    row = db.get_by_id(_get_conn(ctx, readonly=True), record_id)
 
     if not row:
         console.print(f"[red]Record not found: {record_id}[/]")
@@ -273,14 +288,10 @@ def ver(record_id: str) -> None:
 
 
 @cli.command()
-def info() -> None:
+@click.pass_context
+def info(ctx: click.Context) -> None:
     """Show database statistics and sync status."""
-    conn = db.get_connection()
-    try:
-        db.init_db(conn)
-        stats = db.get_stats(conn)
-    finally:
-        conn.close()
+    stats = db.get_stats(_get_conn(ctx, readonly=True))
 
     console.print(Panel(f"[bold]{stats['total']:,}[/] total records", title="Database", border_style="blue"))
 
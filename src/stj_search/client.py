@@ -2,38 +2,70 @@
 
 from __future__ import annotations
 
-import json
+import tempfile
 import time
 import zipfile
-from pathlib import Path
+from collections.abc import Callable, Iterator
+from functools import cache
+from typing import TypeVar
 
 import httpx
+import orjson
 
-from .config import CKAN_BASE_URL, DATA_DIR
+from .config import CKAN_BASE_URL
 
 TIMEOUT = httpx.Timeout(30.0, read=120.0)
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Per download; several may run at once. Larger archives spill to disk.
+ZIP_SPOOL_SIZE = 64 * 1024 * 1024
 
+T = TypeVar("T")
 
-def _request_with_retry(method: str, url: str, **kwargs) -> httpx.Response:
+
+@cache
+def _client() -> httpx.Client:
+    """One pooled HTTP/2 client for the whole process.
+
+    CKAN calls and resource downloads reuse the same connection instead of
+    handshaking every time. Built on first use, so commands that never hit
+    the network don't pay for the transport and SSL setup. The transport
+    retries failed connects; _with_retry handles the rest.
+    """
+    return httpx.Client(
+        timeout=TIMEOUT,
+        transport=httpx.HTTPTransport(
+            http2=True,
+            retries=2,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=20),
+        ),
+    )
+
+
+def _with_retry(fn: Callable[[], T]) -> T:
     for attempt in range(MAX_RETRIES):
         try:
-            with httpx.Client(timeout=TIMEOUT) as client:
-                resp = getattr(client, method)(url, **kwargs)
-                resp.raise_for_status()
-                return resp
-        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            return fn()
+        except (httpx.HTTPStatusError, httpx.TransportError):
             if attempt < MAX_RETRIES - 1:
-                wait = RETRY_DELAY * (attempt + 1)
-                time.sleep(wait)
+                time.sleep(RETRY_DELAY * (attempt + 1))
             else:
                 raise
 
 
+def _request_with_retry(method: str, url: str, **kwargs) -> httpx.Response:
+    def send() -> httpx.Response:
+        resp = _client().request(method, url, **kwargs)
+        resp.raise_for_status()
+        return resp
+
+    return _with_retry(send)
+
+
 def get_dataset_resources(dataset: str) -> list[dict]:
     url = f"{CKAN_BASE_URL}/package_show"
-    resp = _request_with_retry("get", url, params={"id": dataset})
+    resp = _request_with_retry("GET", url, params={"id": dataset})
     result = resp.json()["result"]
     return result["resources"]
 
@@ -48,40 +80,36 @@ def filter_data_resources(resources: list[dict]) -> list[dict]:
 
 
 def download_json(url: str) -> list[dict]:
-    resp = _request_with_retry("get", url, follow_redirects=True)
-    return resp.json()
+    resp = _request_with_retry("GET", url, follow_redirects=True)
+    return orjson.loads(resp.content)
 
 
-def download_and_extract_zip(url: str, dataset: str) -> list[Path]:
-    dest_dir = DATA_DIR / dataset
-    dest_dir.mkdir(parents=True, exist_ok=True)
-    zip_path = dest_dir / "archive.zip"
+def download_zip_members(url: str) -> Iterator[list[dict]]:
+    """Download a ZIP resource and return an iterator over its JSON members.
 
-    for attempt in range(MAX_RETRIES):
+    The archive is fetched before this returns, buffered in memory
+    (spilling to a temporary file past ZIP_SPOOL_SIZE) and never extracted
+    to disk. Each member's records are parsed only when the iterator
+    reaches it, so one member is held in memory at a time.
+    """
+
+    def download() -> tempfile.SpooledTemporaryFile:
+        buf = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_SIZE)
         try:
-            with httpx.Client(timeout=TIMEOUT) as client:
-                with client.stream("GET", url, follow_redirects=True) as resp:
-                    resp.raise_for_status()
-                    with open(zip_path, "wb") as f:
-                        for chunk in resp.iter_bytes(chunk_size=8192):
-                            f.write(chunk)
-            break
-        except (httpx.HTTPStatusError, httpx.TransportError):
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY * (attempt + 1))
-            else:
-                raise
+            with _client().stream("GET", url, follow_redirects=True) as resp:
+                resp.raise_for_status()
+                for chunk in resp.iter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    buf.write(chunk)
+        except BaseException:
+            buf.close()
+            raise
+        return buf
 
-    extracted = []
-    with zipfile.ZipFile(zip_path) as zf:
-        for name in zf.namelist():
-            if name.endswith(".json"):
-                zf.extract(name, dest_dir)
-                extracted.append(dest_dir / name)
-    zip_path.unlink()
-    return extracted
+    return _iter_json_members(_with_retry(download))
 
 
-def parse_json_file(path: Path) -> list[dict]:
-    with open(path, encoding="utf-8") as f:
-        return json.load(f)
+def _iter_json_members(buf: tempfile.SpooledTemporaryFile) -> Iterator[list[dict]]:
+    with buf, zipfile.ZipFile(buf) as zf:
+        for name in zf.namelist():
+            if name.endswith(".json"):
+                yield orjson.loads(zf.read(name))
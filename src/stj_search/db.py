@@ -3,38 +3,23 @@
 from __future__ import annotations
 
 import sqlite3
-from dataclasses import astuple, fields
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import fields
+from itertools import islice
+from operator import attrgetter
 from pathlib import Path
 
 from .config import DB_PATH
 from .models import Acordao
 
-SCHEMA = """
-CREATE TABLE IF NOT EXISTS acordaos (
-    id TEXT PRIMARY KEY,
-    numero_documento TEXT,
-    numero_processo TEXT,
-    numero_registro TEXT,
-    sigla_classe TEXT,
-    descricao_classe TEXT,
-    classe_padronizada TEXT,
-    orgao_julgador TEXT,
-    ministro_relator TEXT,
-    data_publicacao TEXT,
-    ementa TEXT,
-    tipo_decisao TEXT,
-    data_decisao TEXT,
-    decisao TEXT,
-    jurisprudencia_citada TEXT,
-    notas TEXT,
-    informacoes_complementares TEXT,
-    termos_auxiliares TEXT,
-    tese_juridica TEXT,
-    tema TEXT,
-    referencias_legislativas TEXT,
-    acordaos_similares TEXT
-);
+# Bump when SCHEMA or _migrate change; init_db skips both while the
+# database's user_version matches.
+SCHEMA_VERSION = 3
 
+# prefix= keeps extra indexes for 2-4 character prefixes, so short
+# "termo*" queries don't expand into every matching term's doclist.
+FTS_TABLE = """
 CREATE VIRTUAL TABLE IF NOT EXISTS acordaos_fts USING fts5(
     ementa,
     decisao,
@@ -44,18 +29,27 @@ CREATE VIRTUAL TABLE IF NOT EXISTS acordaos_fts USING fts5(
     tese_juridica,
     content='acordaos',
     content_rowid='rowid',
-    tokenize='unicode61 remove_diacritics 2'
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3 4'
 );
+"""
+
+# bm25() weights, in acordaos_fts column order: ementa, decisao,
+# informacoes_complementares, termos_auxiliares, notas, tese_juridica.
+BM25_WEIGHTS = (10.0, 3.0, 1.0, 1.0, 1.0, 2.0)
 
--- Triggers to keep FTS in sync with content table
+FTS_TRIGGERS = """
+-- Triggers to keep FTS and the cached row count in sync with content table
 CREATE TRIGGER IF NOT EXISTS acordaos_ai AFTER INSERT ON acordaos BEGIN
     INSERT INTO acordaos_fts(rowid, ementa, decisao, informacoes_complementares, termos_auxiliares, notas, tese_juridica)
     VALUES (new.rowid, new.ementa, new.decisao, new.informacoes_complementares, new.termos_auxiliares, new.notas, new.tese_juridica);
+    UPDATE stats_cache SET value = value + 1 WHERE key = 'total_acordaos';
 END;
 
 CREATE TRIGGER IF NOT EXISTS acordaos_ad AFTER DELETE ON acordaos BEGIN
     INSERT INTO acordaos_fts(acordaos_fts, rowid, ementa, decisao, informacoes_complementares, termos_auxiliares, notas, tese_juridica)
     VALUES ('delete', old.rowid, old.ementa, old.decisao, old.informacoes_complementares, old.termos_auxiliares, old.notas, old.tese_juridica);
+    UPDATE stats_cache SET value = value - 1 WHERE key = 'total_acordaos';
 END;
 
 CREATE TRIGGER IF NOT EXISTS acordaos_au AFTER UPDATE ON acordaos BEGIN
@@ -64,7 +58,46 @@ CREATE TRIGGER IF NOT EXISTS acordaos_au AFTER UPDATE ON acordaos BEGIN
     INSERT INTO acordaos_fts(rowid, ementa, decisao, informacoes_complementares, termos_auxiliares, notas, tese_juridica)
     VALUES (new.rowid, new.ementa, new.decisao, new.informacoes_complementares, new.termos_auxiliares, new.notas, new.tese_juridica);
 END;
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS acordaos (
+    id TEXT PRIMARY KEY,
+    numero_documento TEXT,
+    numero_processo TEXT,
+    numero_registro TEXT,
+    sigla_classe TEXT,
+    descricao_classe TEXT,
+    classe_padronizada TEXT,
+    orgao_julgador TEXT,
+    ministro_relator TEXT,
+    data_publicacao TEXT,
+    ementa TEXT,
+    tipo_decisao TEXT,
+    data_decisao TEXT,
+    decisao TEXT,
+    jurisprudencia_citada TEXT,
+    notas TEXT,
+    informacoes_complementares TEXT,
+    termos_auxiliares TEXT,
+    tese_juridica TEXT,
+    tema TEXT,
+    referencias_legislativas TEXT,
+    acordaos_similares TEXT
+);
+
+-- NOCASE so the case-insensitive prefix LIKE in _build_filters can use them
+CREATE INDEX IF NOT EXISTS idx_acordaos_relator ON acordaos(ministro_relator COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_acordaos_classe ON acordaos(sigla_classe COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_acordaos_data ON acordaos(data_decisao);
 
+-- Counters maintained by the triggers below; SQLite doesn't cache COUNT(*)
+CREATE TABLE IF NOT EXISTS stats_cache (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+""" + FTS_TABLE + FTS_TRIGGERS + """
 CREATE TABLE IF NOT EXISTS sync_state (
     dataset TEXT NOT NULL,
     resource_id TEXT NOT NULL,
@@ -75,17 +108,29 @@ CREATE TABLE IF NOT EXISTS sync_state (
 """
 
 
-def get_connection(db_path: Path = DB_PATH) -> sqlite3.Connection:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+def get_connection(db_path: Path = DB_PATH, *, readonly: bool = False) -> sqlite3.Connection:
+    """Open the database, read-only when ``readonly`` is set.
+
+    A read-only connection cannot create or migrate the schema; check it
+    with needs_init and run init_db on a writable connection if needed.
+    """
+    if readonly:
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    else:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA mmap_size=2147483648")
+    conn.execute("PRAGMA cache_size=-200000")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
 
 def _migrate(conn: sqlite3.Connection) -> None:
-    """Add columns that may be missing from older databases."""
+    """Bring databases created by older versions up to SCHEMA."""
     existing = {
         row[1]
         for row in conn.execute("PRAGMA table_info(acordaos)").fetchall()
@@ -99,23 +144,165 @@ def _migrate(conn: sqlite3.Connection) -> None:
             conn.execute(f"ALTER TABLE acordaos ADD COLUMN {col} {col_type}")
     conn.commit()
 
+    fts_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'acordaos_fts'"
+    ).fetchone()[0]
+    if "prefix=" not in fts_sql:
+        # Marked dirty along with the swap, so the rebuild below still
+        # happens on the next run if the process dies before it commits.
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR REPLACE INTO stats_cache (key, value) VALUES ('fts_dirty', 1)")
+            conn.execute("DROP TABLE acordaos_fts")
+            conn.execute(FTS_TABLE)
+
+    # Trigger bodies change between versions; IF NOT EXISTS won't replace them.
+    for trigger in ("acordaos_ai", "acordaos_ad", "acordaos_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.executescript(FTS_TRIGGERS)
+    # The FTS table was just recreated, or a deferred_fts load never
+    # finished and left rows out of the index.
+    if _fts_dirty(conn):
+        conn.execute("INSERT INTO acordaos_fts(acordaos_fts) VALUES('rebuild')")
+        conn.execute("DELETE FROM stats_cache WHERE key = 'fts_dirty'")
+    _refresh_row_count(conn)
+    conn.commit()
+
+
+def _refresh_row_count(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO stats_cache (key, value) "
+        "SELECT 'total_acordaos', COUNT(*) FROM acordaos"
+    )
+
+
+def _fts_dirty(conn: sqlite3.Connection) -> bool:
+    """Whether a deferred_fts load is running or was interrupted."""
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_cache'"
+    ).fetchone()
+    return has_table is not None and conn.execute(
+        "SELECT 1 FROM stats_cache WHERE key = 'fts_dirty'"
+    ).fetchone() is not None
+
+
+def needs_init(conn: sqlite3.Connection) -> bool:
+    """Whether a reader should run init_db before querying.
+
+    False during a deferred_fts load even though user_version is stale:
+    migrating then would bring the triggers back mid-load. The next sync
+    finishes the job if the load was interrupted.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+        return False
+    return not _fts_dirty(conn)
+
 
 def init_db(conn: sqlite3.Connection) -> None:
+    if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+        return
     conn.executescript(SCHEMA)
     _migrate(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+
+
+def upsert_acordaos(conn: sqlite3.Connection, records: Iterable[Acordao]) -> int:
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return bulk_load(conn, records)
+
+
+BULK_CHUNK_SIZE = 10_000
+
+_ACORDAO_COLUMNS = [f.name for f in fields(Acordao)]
+# Flat field getter in column order; cheaper than dataclasses.astuple,
+# which deep-copies every field.
+_acordao_row = attrgetter(*_ACORDAO_COLUMNS)
+
+# An upsert rather than INSERT OR REPLACE: updating in place keeps the
+# rowid and fires only the update trigger, where REPLACE deletes and
+# reinserts the row, churning the FTS index twice.
+_UPSERT_SQL = (
+    f"INSERT INTO acordaos ({', '.join(_ACORDAO_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _ACORDAO_COLUMNS)}) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _ACORDAO_COLUMNS if col != "id")
+)
+
+
+def bulk_load_rows(
+    conn: sqlite3.Connection,
+    rows: Iterable[tuple],
+    on_chunk: Callable[[int], None] | None = None,
+) -> int:
+    """Insert row tuples (in Acordao field order) in chunks without committing.
+
+    The caller owns the transaction, so a resource's rows and its
+    sync_state entry can be committed together. ``on_chunk`` is called with
+    the size of each chunk once it is written.
+    """
+    rows = iter(rows)
+    total = 0
+    while chunk := list(islice(rows, BULK_CHUNK_SIZE)):
+        conn.executemany(_UPSERT_SQL, chunk)
+        total += len(chunk)
+        if on_chunk:
+            on_chunk(len(chunk))
+    return total
+
+
+def bulk_load(conn: sqlite3.Connection, records: Iterable[Acordao]) -> int:
+    return bulk_load_rows(conn, map(_acordao_row, records))
 
 
-def upsert_acordaos(conn: sqlite3.Connection, records: list[Acordao]) -> int:
-    if not records:
-        return 0
-    cols = [f.name for f in fields(Acordao)]
-    placeholders = ", ".join("?" for _ in cols)
-    col_names = ", ".join(cols)
-    sql = f"INSERT OR REPLACE INTO acordaos ({col_names}) VALUES ({placeholders})"
-    rows = [astuple(r) for r in records]
-    conn.executemany(sql, rows)
+@contextmanager
+def deferred_fts(conn: sqlite3.Connection) -> Iterator[None]:
+    """Drop the FTS triggers for the duration of a large load.
+
+    The index is rebuilt and the cached row count recomputed once on exit
+    instead of being updated row by row.
+    """
+    # If the process dies mid-load, the next init_db sees the stale
+    # user_version, puts the triggers back and, because of the fts_dirty
+    # marker, rebuilds the index for the rows committed in the meantime.
+    # One transaction, so the triggers are never gone without the marker
+    # (sqlite3 doesn't open one implicitly before DDL).
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR REPLACE INTO stats_cache (key, value) VALUES ('fts_dirty', 1)")
+        conn.execute("PRAGMA user_version = 0")
+        for trigger in ("acordaos_ai", "acordaos_ad", "acordaos_au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    try:
+        yield
+    finally:
+        conn.commit()
+        conn.execute("INSERT INTO acordaos_fts(acordaos_fts) VALUES('rebuild')")
+        _refresh_row_count(conn)
+        conn.execute("DELETE FROM stats_cache WHERE key = 'fts_dirty'")
+        conn.commit()
+        conn.executescript(FTS_TRIGGERS)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def optimize(conn: sqlite3.Connection, *, full: bool = False) -> None:
+    """Merge FTS segments and refresh planner statistics after a sync.
+
+    ``full`` rewrites the whole index into one segment, which is only worth
+    it after a full load; incremental syncs do a bounded merge instead.
+    """
+    if full:
+        conn.execute("INSERT INTO acordaos_fts(acordaos_fts) VALUES('optimize')")
+    else:
+        conn.execute("INSERT INTO acordaos_fts(acordaos_fts, rank) VALUES('merge', 500)")
+    conn.commit()
+    conn.execute("ANALYZE acordaos")
     conn.commit()
-    return len(rows)
+
+
+def has_records(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM acordaos LIMIT 1").fetchone() is not None
 
 
 def mark_synced(
@@ -128,7 +315,6 @@ def mark_synced(
         "INSERT OR REPLACE INTO sync_state (dataset, resource_id, resource_name) VALUES (?, ?, ?)",
         (dataset, resource_id, resource_name),
     )
-    conn.commit()
 
 
 def is_synced(conn: sqlite3.Connection, dataset: str, resource_id: str) -> bool:
@@ -147,6 +333,13 @@ def clear_sync_state(conn: sqlite3.Connection, dataset: str | None = None) -> No
     conn.commit()
 
 
+def _like_prefix(value: str) -> str:
+    """Anchor plain input as a prefix; input with wildcards is used as given."""
+    if "%" in value or "_" in value:
+        return value
+    return f"{value}%"
+
+
 def _build_filters(
     *,
     ministro: str | None = None,
@@ -157,10 +350,10 @@ def _build_filters(
     params: list[str] = []
     if ministro:
         clauses.append("a.ministro_relator LIKE ?")
-        params.append(f"%{ministro}%")
+        params.append(_like_prefix(ministro))
     if classe:
         clauses.append("a.sigla_classe LIKE ?")
-        params.append(f"%{classe}%")
+        params.append(_like_prefix(classe))
     if desde:
         clauses.append("a.data_decisao >= ?")
         params.append(desde)
@@ -177,21 +370,38 @@ def search(
     desde: str | None = None,
     limit: int = 20,
     order: str = "data",
-) -> list[sqlite3.Row]:
+) -> list[tuple[str, str, str, str, str]]:
+    """Return (id, sigla_classe, ministro_relator, data_decisao, ementa) tuples."""
     filter_sql, filter_params = _build_filters(
         ministro=ministro, classe=classe, desde=desde
     )
-    order_clause = "a.data_decisao DESC" if order == "data" else "rank"
+    order_clause = "a.data_decisao DESC" if order == "data" else "fm.rank"
+    # Ranking by relevance with no post-filters can stop at `limit` inside
+    # the CTE; otherwise every match has to reach the outer query.
+    match_limit = "ORDER BY rank LIMIT ?" if order != "data" and not filter_sql else ""
+    weights = ", ".join(map(str, BM25_WEIGHTS))
     sql = f"""
-        SELECT a.*, bm25(acordaos_fts) AS rank
-        FROM acordaos_fts f
-        JOIN acordaos a ON a.rowid = f.rowid
-        WHERE acordaos_fts MATCH ?
-        {filter_sql}
+        WITH fts_matches AS MATERIALIZED (
+            SELECT rowid, bm25(acordaos_fts, {weights}) AS rank
+            FROM acordaos_fts
+            WHERE acordaos_fts MATCH ?
+            {match_limit}
+        )
+        SELECT a.id, a.sigla_classe, a.ministro_relator, a.data_decisao, a.ementa
+        FROM fts_matches fm
+        JOIN acordaos a ON a.rowid = fm.rowid
+        WHERE 1 {filter_sql}
         ORDER BY {order_clause} LIMIT ?
     """
-    params: list[str | int] = [query, *filter_params, limit]
-    return conn.execute(sql, params).fetchall()
+    params: list[str | int] = [query]
+    if match_limit:
+        params.append(limit)
+    params += [*filter_params, limit]
+    # Plain tuples: the caller unpacks positionally, and sqlite3.Row's
+    # by-name lookup is a linear scan of the column names.
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur.execute(sql, params).fetchall()
 
 
 def search_stats(
@@ -205,34 +415,43 @@ def search_stats(
     filter_sql, filter_params = _build_filters(
         ministro=ministro, classe=classe, desde=desde
     )
-    base = f"""
-        FROM acordaos_fts f
-        JOIN acordaos a ON a.rowid = f.rowid
-        WHERE acordaos_fts MATCH ?
-        {filter_sql}
-    """
-    base_params: list[str] = [query, *filter_params]
-
-    total = conn.execute(f"SELECT COUNT(*) {base}", base_params).fetchone()[0]
-    by_orgao = conn.execute(
-        f"SELECT a.orgao_julgador, COUNT(*) as cnt {base} GROUP BY a.orgao_julgador ORDER BY cnt DESC",
-        base_params,
-    ).fetchall()
-    by_classe = conn.execute(
-        f"SELECT a.sigla_classe, COUNT(*) as cnt {base} GROUP BY a.sigla_classe ORDER BY cnt DESC LIMIT 10",
-        base_params,
-    ).fetchall()
-    by_relator = conn.execute(
-        f"SELECT a.ministro_relator, COUNT(*) as cnt {base} GROUP BY a.ministro_relator ORDER BY cnt DESC LIMIT 10",
-        base_params,
-    ).fetchall()
-    by_year = conn.execute(
-        f"SELECT SUBSTR(a.data_decisao, 1, 4) as ano, COUNT(*) as cnt {base} AND a.data_decisao != '' GROUP BY ano ORDER BY ano DESC LIMIT 15",
-        base_params,
-    ).fetchall()
+    # Materialize the filtered match set once, narrowed to the grouping
+    # columns, so the aggregations below don't each re-run the MATCH and
+    # the join.
+    conn.execute("DROP TABLE IF EXISTS temp._matches")
+    conn.execute(
+        f"""
+        CREATE TEMP TABLE _matches AS
+        WITH fts_matches AS MATERIALIZED (
+            SELECT rowid FROM acordaos_fts WHERE acordaos_fts MATCH ?
+        )
+        SELECT a.orgao_julgador, a.sigla_classe, a.ministro_relator,
+               NULLIF(SUBSTR(a.data_decisao, 1, 4), '') AS ano
+        FROM fts_matches fm
+        JOIN acordaos a ON a.rowid = fm.rowid
+        WHERE 1 {filter_sql}
+        """,
+        [query, *filter_params],
+    )
+    try:
+        by_orgao = conn.execute(
+            "SELECT orgao_julgador, COUNT(*) as cnt FROM _matches GROUP BY orgao_julgador ORDER BY cnt DESC"
+        ).fetchall()
+        by_classe = conn.execute(
+            "SELECT sigla_classe, COUNT(*) as cnt FROM _matches GROUP BY sigla_classe ORDER BY cnt DESC LIMIT 10"
+        ).fetchall()
+        by_relator = conn.execute(
+            "SELECT ministro_relator, COUNT(*) as cnt FROM _matches GROUP BY ministro_relator ORDER BY cnt DESC LIMIT 10"
+        ).fetchall()
+        by_year = conn.execute(
+            "SELECT ano, COUNT(*) as cnt FROM _matches WHERE ano IS NOT NULL GROUP BY ano ORDER BY ano DESC LIMIT 15"
+        ).fetchall()
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp._matches")
 
     return {
-        "total": total,
+        # by_orgao is unlimited, so its counts add up to the match total.
+        "total": sum(row["cnt"] for row in by_orgao),
         "by_orgao": by_orgao,
         "by_classe": by_classe,
         "by_relator": by_relator,
@@ -247,7 +466,10 @@ def get_by_id(conn: sqlite3.Connection, record_id: str) -> sqlite3.Row | None:
 
 
 def get_stats(conn: sqlite3.Connection) -> dict:
-    total = conn.execute("SELECT COUNT(*) FROM acordaos").fetchone()[0]
+    row = conn.execute(
+        "SELECT value FROM stats_cache WHERE key = 'total_acordaos'"
+    ).fetchone()
+    total = row[0] if row else conn.execute("SELECT COUNT(*) FROM acordaos").fetchone()[0]
     by_orgao = conn.execute(
         "SELECT orgao_julgador, COUNT(*) as cnt FROM acordaos GROUP BY orgao_julgador ORDER BY cnt DESC"
     ).fetchall()
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 
+import orjson
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Acordao:
     id: str
     numero_documento: str | None
@@ -33,33 +34,42 @@ class Acordao:
 
     @classmethod
     def from_json(cls, data: dict) -> Acordao:
-        refs = data.get("referenciasLegislativas")
-        if isinstance(refs, list):
-            refs = json.dumps(refs, ensure_ascii=False) if refs else ""
-        similares = data.get("acordaosSimilares")
-        if isinstance(similares, list):
-            similares = json.dumps(similares, ensure_ascii=False) if similares else ""
-        return cls(
-            id=str(data["id"]),
-            numero_documento=data.get("numeroDocumento"),
-            numero_processo=data.get("numeroProcesso", ""),
-            numero_registro=data.get("numeroRegistro", ""),
-            sigla_classe=data.get("siglaClasse", ""),
-            descricao_classe=data.get("descricaoClasse", ""),
-            classe_padronizada=data.get("classePadronizada"),
-            orgao_julgador=data.get("nomeOrgaoJulgador", ""),
-            ministro_relator=data.get("ministroRelator", ""),
-            data_publicacao=data.get("dataPublicacao", ""),
-            ementa=data.get("ementa", ""),
-            tipo_decisao=data.get("tipoDeDecisao", ""),
-            data_decisao=data.get("dataDecisao", ""),
-            decisao=data.get("decisao", ""),
-            jurisprudencia_citada=data.get("jurisprudenciaCitada"),
-            notas=data.get("notas"),
-            informacoes_complementares=data.get("informacoesComplementares"),
-            termos_auxiliares=data.get("termosAuxiliares"),
-            tese_juridica=data.get("teseJuridica"),
-            tema=data.get("tema"),
-            referencias_legislativas=refs or "",
-            acordaos_similares=similares or "",
-        )
+        return cls(*tuple_from_json(data))
+
+
+def _json_list(value) -> str:
+    if isinstance(value, list):
+        return orjson.dumps(value).decode() if value else ""
+    return value or ""
+
+
+def tuple_from_json(data: dict) -> tuple:
+    """Convert a raw JSON record straight to a row tuple in Acordao field order.
+
+    The sync path inserts these directly, skipping the dataclass.
+    """
+    get = data.get
+    return (
+        str(data["id"]),
+        get("numeroDocumento"),
+        get("numeroProcesso", ""),
+        get("numeroRegistro", ""),
+        get("siglaClasse", ""),
+        get("descricaoClasse", ""),
+        get("classePadronizada"),
+        get("nomeOrgaoJulgador", ""),
+        get("ministroRelator", ""),
+        get("dataPublicacao", ""),
+        get("ementa", ""),
+        get("tipoDeDecisao", ""),
+        get("dataDecisao", ""),
+        get("decisao", ""),
+        get("jurisprudenciaCitada"),
+        get("notas"),
+        get("informacoesComplementares"),
+        get("termosAuxiliares"),
+        get("teseJuridica"),
+        get("tema"),
+        _json_list(get("referenciasLegislativas")),
+        _json_list(get("acordaosSimilares")),
+    )
@@ -3,17 +3,96 @@
 from __future__ import annotations
 
 import sqlite3
-from pathlib import Path
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from itertools import islice
 
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, MofNCompleteColumn
 
 from . import client, db
 from .config import DATASETS
-from .models import Acordao
+from .models import tuple_from_json
 
 console = Console()
 
+# Resources downloaded or held parsed at once, including the one being
+# written; bounds memory on datasets with large resources.
+DOWNLOAD_WORKERS = 2
+
+
+def _download_records(res: dict) -> tuple[Iterator[list[tuple]], int | None]:
+    """Download one resource in a worker thread.
+
+    Returns its rows in batches, plus the row count when it is known up
+    front. JSON resources are parsed here. ZIP members are parsed one at a
+    time as the writer consumes them, so a large archive never has all of
+    its records in memory at once; their count is only known at the end.
+    """
+    if res.get("format", "").upper() == "ZIP":
+        members = client.download_zip_members(res["url"])
+        return ([tuple_from_json(r) for r in records] for records in members), None
+    rows = [tuple_from_json(r) for r in client.download_json(res["url"])]
+    return iter([rows]), len(rows)
+
+
+def _download_all(resources: list[dict]) -> Iterator[tuple[dict, Future]]:
+    """Yield (resource, future) pairs in resource order.
+
+    The next download is only submitted when the caller comes back for
+    another resource, after it has written the current one, so at most
+    DOWNLOAD_WORKERS resources are in flight or in memory at any time.
+    Results are handed over in the original order so later resources
+    still overwrite earlier ones.
+    """
+    pending = iter(resources)
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        queue = deque(
+            (res, pool.submit(_download_records, res))
+            for res in islice(pending, DOWNLOAD_WORKERS)
+        )
+        while queue:
+            yield queue.popleft()
+            for nxt in islice(pending, 1):
+                queue.append((nxt, pool.submit(_download_records, nxt)))
+
+
+def _write_resource(
+    conn: sqlite3.Connection,
+    dataset: str,
+    res: dict,
+    future: Future,
+    progress: Progress | None,
+) -> int:
+    """Load one downloaded resource and mark it synced in a single transaction.
+
+    Kept separate from the loop in sync_dataset so the resource's rows are
+    released as soon as it is committed.
+    """
+    res_name = res.get("name", "")
+    records_id = progress.add_task(f"  {res_name}", total=None) if progress else None
+    on_chunk = None
+    if progress and records_id is not None:
+        # Advanced once per bulk_load_rows chunk rather than per record.
+        on_chunk = partial(progress.advance, records_id)
+    try:
+        batches, total = future.result()
+        if progress and records_id is not None:
+            progress.update(records_id, total=total)
+        count = 0
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for rows in batches:
+                count += db.bulk_load_rows(conn, rows, on_chunk)
+            db.mark_synced(conn, dataset, res["id"], res_name)
+        return count
+    finally:
+        if progress and records_id is not None:
+            progress.remove_task(records_id)
+
 
 def sync_dataset(
     conn: sqlite3.Connection,
@@ -22,12 +101,13 @@ def sync_dataset(
     force: bool = False,
     progress: Progress | None = None,
 ) -> int:
-    console.print(f"[bold blue]Dataset:[/] {dataset}")
+    out = progress.console if progress else console
+    out.print(f"[bold blue]Dataset:[/] {dataset}")
     resources = client.get_dataset_resources(dataset)
     data_resources = client.filter_data_resources(resources)
 
     if not data_resources:
-        console.print("  [yellow]No data resources found.[/]")
+        out.print("  [yellow]No data resources found.[/]")
         return 0
 
     total_upserted = 0
@@ -35,42 +115,26 @@ def sync_dataset(
     if progress:
         task_id = progress.add_task(dataset, total=len(data_resources))
 
+    to_fetch = []
     for res in data_resources:
-        res_id = res["id"]
-        res_name = res.get("name", "")
-        res_format = res.get("format", "").upper()
-        res_url = res["url"]
-
-        if not force and db.is_synced(conn, dataset, res_id):
+        if not force and db.is_synced(conn, dataset, res["id"]):
             if progress and task_id is not None:
                 progress.advance(task_id)
-            continue
-
-        console.print(f"  [dim]Downloading {res_name}...[/]")
+        else:
+            to_fetch.append(res)
 
+    # Downloads and parsing run in worker threads; all writes stay on this
+    # thread, which owns the connection.
+    for res, future in _download_all(to_fetch):
         try:
-            if res_format == "ZIP":
-                json_files = client.download_and_extract_zip(res_url, dataset)
-                for json_file in json_files:
-                    raw = client.parse_json_file(json_file)
-                    records = [Acordao.from_json(r) for r in raw]
-                    count = db.upsert_acordaos(conn, records)
-                    total_upserted += count
-                    json_file.unlink(missing_ok=True)
-            else:
-                raw = client.download_json(res_url)
-                records = [Acordao.from_json(r) for r in raw]
-                count = db.upsert_acordaos(conn, records)
-                total_upserted += count
-
-            db.mark_synced(conn, dataset, res_id, res_name)
+            total_upserted += _write_resource(conn, dataset, res, future, progress)
         except Exception as e:
-            console.print(f"  [red]Error processing {res_name}: {e}[/]")
+            out.print(f"  [red]Error processing {res.get('name', '')}: {e}[/]")
 
         if progress and task_id is not None:
             progress.advance(task_id)
 
-    console.print(f"  [green]{total_upserted} records upserted.[/]")
+    out.print(f"  [green]{total_upserted} records upserted.[/]")
     return total_upserted
 
 
@@ -81,19 +145,32 @@ def sync_all(
     force: bool = False,
 ) -> int:
     db.init_db(conn)
+    # Checkpoint less often during bulk loads; the WAL is truncated at the end.
+    conn.execute("PRAGMA wal_autocheckpoint=10000")
     datasets = [dataset_filter] if dataset_filter else DATASETS
     total = 0
+    # Maintaining the FTS index row by row only pays off for incremental
+    # syncs; full loads rebuild it once at the end.
+    defer_fts = force or not db.has_records(conn)
+    fts_guard = db.deferred_fts(conn) if defer_fts else nullcontext()
 
-    with Progress(
+    with fts_guard, Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
         TaskProgressColumn(),
+        # Shows record counts for ZIP resources, whose total is unknown.
+        MofNCompleteColumn(),
         console=console,
     ) as progress:
         for ds in datasets:
             count = sync_dataset(conn, ds, force=force, progress=progress)
             total += count
 
+    if total:
+        with console.status("Optimizing search index..."):
+            db.optimize(conn, full=defer_fts)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
     console.print(f"\n[bold green]Sync complete. {total} total records upserted.[/]")
     return total